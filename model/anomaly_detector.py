@@ -1,33 +1,95 @@
+import numpy as np
 import pandas as pd
+import streamlit as st
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import MinMaxScaler
 
-def detect_anomalies(df):
-    df = df.copy()
+FEATURES = ['Water_Usage_Liters', 'Pressure']
+RISK_LEVELS = ['High', 'Medium', 'Low']
+SCORES_STATE_KEY = '_anomaly_scores'
 
-    features = df[['Water_Usage_Liters', 'Pressure']]
 
-    model = IsolationForest(contamination=0.2, random_state=42)
-    df['anomaly'] = model.fit_predict(features)
+def _feature_matrix(df):
+    # float32, C-contiguous: what the tree traversal consumes natively
+    return np.ascontiguousarray(df[FEATURES].to_numpy(dtype=np.float32))
+
+
+@st.cache_resource
+def _train_model(data_key, _features):
+    # Fitted once per data_key; _features is not hashed by Streamlit
+    # Two features need far fewer than the default 100 trees
+    model = IsolationForest(
+        contamination=0.2,
+        random_state=42,
+        n_estimators=40,
+        max_samples=min(256, len(_features)),
+        n_jobs=-1
+    )
+    model.fit(_features)
+    # Scoring runs on a handful of rows per rerun; a joblib pool costs more
+    model.n_jobs = 1
+
+    # Bounds used to normalize score to 0–100
+    s = -model.decision_function(_features)
+    bounds = (s.min(), s.max())
+
+    return model, bounds
+
+
+def _decision_scores(model, data_key, features):
+    # Re-score only rows whose features changed since the previous run
+    prev = st.session_state.get(SCORES_STATE_KEY)
+
+    # Old scores are only reusable if the same fitted forest produced them
+    if (
+        prev is not None
+        and prev[0] is model
+        and prev[1] == data_key
+        and prev[2].shape == features.shape
+    ):
+        changed = (prev[2] != features).any(axis=1)
+        scores = prev[3].copy()
+        if changed.any():
+            scores[changed] = model.decision_function(features[changed])
+    else:
+        scores = model.decision_function(features)
+
+    st.session_state[SCORES_STATE_KEY] = (model, data_key, features, scores)
+    return scores
+
+
+def _score(model, bounds, df, data_key):
+    features = _feature_matrix(df)
 
     # Anomaly score (the lower, the more abnormal)
-    df['anomaly_score'] = model.decision_function(features)
+    scores = _decision_scores(model, data_key, features)
+    df['anomaly_score'] = scores
 
-    # Normalize score to 0–100
-    scaler = MinMaxScaler(feature_range=(0, 100))
-    df['risk_score'] = scaler.fit_transform(
-        (-df['anomaly_score']).values.reshape(-1, 1)
+    # Same labels as model.predict, without a second pass over the trees
+    df['anomaly'] = np.where(scores < 0, -1, 1)
+
+    # Normalize score to 0–100; live rows can fall outside the training bounds
+    s = -df['anomaly_score'].to_numpy()
+    lo, hi = bounds
+    df['risk_score'] = (
+        np.clip((s - lo) * (100.0 / (hi - lo)), 0.0, 100.0) if hi > lo else 0.0
     )
 
-    # Risk levels
-    def risk_level(score):
-        if score >= 70:
-            return "High"
-        elif score >= 40:
-            return "Medium"
-        else:
-            return "Low"
+    return df
+
+
+def detect_anomalies(df, data_key, train_df):
+    # Only new columns are added, so the caller's data can be shared
+    df = df.copy(deep=False)
 
-    df['Risk_Level'] = df['risk_score'].apply(risk_level)
+    # Fit on the unmodified CSV (train_df) and only score the live frame
+    model, bounds = _train_model(data_key, _feature_matrix(train_df))
+    df = _score(model, bounds, df, data_key)
+
+    # Risk levels (codes: 0 = High, 1 = Medium, 2 = Low)
+    score = df['risk_score'].to_numpy()
+    df['Risk_Level'] = pd.Categorical.from_codes(
+        np.where(score >= 70, 0, np.where(score >= 40, 1, 2)),
+        categories=RISK_LEVELS
+    )
 
     return df
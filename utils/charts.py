@@ -0,0 +1,259 @@
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+# Builders are cached on (zone, fingerprint); the underscore-prefixed
+# data arguments are not hashed by Streamlit. cache_resource returns the
+# stored figure without a pickle round-trip (figures are never mutated),
+# and max_entries bounds the entries left by live-data fingerprints.
+# Traces get NumPy arrays so Plotly can use its typed-array encoding, and
+# uirevision keeps pan/zoom state across reruns for the same zone.
+
+# A few entries per zone, per builder
+MAX_CACHED_FIGS = 12
+
+DAYS_ORDER = [
+    "Monday", "Tuesday", "Wednesday",
+    "Thursday", "Friday", "Saturday", "Sunday"
+]
+
+
+def zone_fingerprint(zone_data):
+    # Cheap stand-in for hashing the whole frame
+    return (
+        len(zone_data),
+        float(zone_data["Water_Usage_Liters"].sum()),
+        float(zone_data["Pressure"].sum()),
+        float(zone_data["risk_score"].sum()),
+        str(zone_data["Date"].max()),
+    )
+
+
+def rolling_mean(values, window):
+    # Trailing mean via cumulative sums; first window-1 slots are NaN
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        csum = np.cumsum(np.concatenate(([0.0], values)))
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_usage_fig(zone, fingerprint, _zone_data):
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=_zone_data["Date"].to_numpy(),
+        y=_zone_data["Water_Usage_Liters"].to_numpy(),
+        mode="lines+markers",
+        name="Actual Usage",
+        line=dict(color="#22d3ee", width=3)
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=_zone_data["Date"].to_numpy(),
+        y=rolling_mean(_zone_data["Water_Usage_Liters"].to_numpy(), 2),
+        mode="lines",
+        name="Expected Usage",
+        line=dict(color="#94a3b8", dash="dash")
+    ))
+
+    fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=420,
+        xaxis_title="Time",
+        yaxis_title="Water Usage (Liters)",
+        legend=dict(orientation="h", y=1.1)
+    )
+
+    return fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_hist_fig(zone, fingerprint, _daily_agg):
+    hist_fig = go.Figure()
+    hist_fig.add_trace(go.Scatter(
+        x=_daily_agg["Date"].to_numpy(),
+        y=_daily_agg["sum"].to_numpy(),
+        mode="lines+markers",
+        name="Water Loss Risk"
+    ))
+
+    hist_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=300,
+        xaxis_title="Date",
+        yaxis_title="Risk Score"
+    )
+
+    return hist_fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_pred_fig(zone, fingerprint, _zone_data):
+    predicted = rolling_mean(_zone_data["risk_score"].to_numpy(), 3)
+    # Backfill the warm-up window with the first full mean
+    if len(predicted) >= 3:
+        predicted[:2] = predicted[2]
+
+    pred_fig = go.Figure()
+    pred_fig.add_trace(go.Scatter(
+        x=_zone_data["Date"].to_numpy(),
+        y=predicted,
+        mode="lines+markers",
+        name="Predicted Risk"
+    ))
+
+    pred_fig.add_hline(y=predicted.mean(), line_dash="dot")
+
+    pred_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=300,
+        xaxis_title="Date",
+        yaxis_title="Predicted Risk"
+    )
+
+    return pred_fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_pie_fig(zone, fingerprint, _risk_counts):
+    pie_fig = go.Figure(
+        data=[go.Pie(
+            labels=_risk_counts.index.to_numpy(),
+            values=_risk_counts.values,
+            hole=0.65,                         # 🔥 better donut thickness
+            textinfo="percent",
+            textfont=dict(size=16),
+            marker=dict(
+                colors=["#38bdf8", "#4b2fbb"],
+                line=dict(color="#0f172a", width=4)
+            )
+        )]
+    )
+
+    pie_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=420,                           # 🔥 THIS makes it big
+        margin=dict(t=20, b=20, l=20, r=20),  # prevents shrinking
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            y=0.5,
+            yanchor="middle",
+            font=dict(size=14)
+        ),
+        annotations=[
+            dict(
+                text="<b>Risk</b>",
+                x=0.5,
+                y=0.5,
+                font_size=22,
+                showarrow=False
+            )
+        ]
+    )
+
+    return pie_fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_bar_fig(zone, fingerprint, _daily_agg):
+    bar_fig = go.Figure()
+
+    bar_fig.add_bar(
+        x=_daily_agg["Date"].to_numpy(),
+        y=_daily_agg["mean"].to_numpy(),
+        marker_color="#38bdf8",
+        name="Average Risk"
+    )
+
+    bar_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=320,
+        xaxis_title="Date",
+        yaxis_title="Risk Score"
+    )
+
+    return bar_fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_scatter_fig(zone, fingerprint, _zone_data):
+    scatter_fig = go.Figure()
+
+    scatter_fig.add_trace(go.Scatter(
+        x=_zone_data["Pressure"].to_numpy(),
+        y=_zone_data["Water_Usage_Liters"].to_numpy(),
+        mode="markers",
+        marker=dict(
+            size=10,
+            color=_zone_data["risk_score"].to_numpy(),
+            colorscale="RdYlGn_r",
+            showscale=True
+        ),
+        name="Sensor Readings"
+    ))
+
+    scatter_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=350,
+        xaxis_title="Pressure",
+        yaxis_title="Water Usage (Liters)"
+    )
+
+    return scatter_fig
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FIGS)
+def build_timeline_fig(zone, fingerprint, _zone_data):
+    timeline_df = _zone_data.assign(Day=_zone_data["Date"].dt.day_name())
+
+    total_events = timeline_df.groupby("Day").size()
+    anomaly_events = timeline_df[
+        timeline_df["Risk_Level"].isin(["Medium", "High", "Critical"])
+    ].groupby("Day").size()
+
+    total_events = total_events.reindex(DAYS_ORDER, fill_value=0)
+    anomaly_events = anomaly_events.reindex(DAYS_ORDER, fill_value=0)
+
+    timeline_fig = go.Figure()
+
+    timeline_fig.add_trace(go.Scatter(
+        x=DAYS_ORDER,
+        y=total_events.values,
+        mode="lines+markers",
+        name="Total Events",
+        line=dict(color="#22d3ee", width=3),
+        marker=dict(size=8),
+        fill="tozeroy",
+        fillcolor="rgba(34,211,238,0.15)"
+    ))
+
+    timeline_fig.add_trace(go.Scatter(
+        x=DAYS_ORDER,
+        y=anomaly_events.values,
+        mode="lines+markers",
+        name="Anomalies",
+        line=dict(color="#fb7185", width=3),
+        marker=dict(size=8)
+    ))
+
+    timeline_fig.update_layout(
+        template="plotly_dark",
+        uirevision=zone,
+        height=360,
+        xaxis_title="Day",
+        yaxis_title="Events",
+        legend=dict(orientation="h", y=-0.25),
+        margin=dict(l=20, r=20, t=30, b=40)
+    )
+
+    return timeline_fig
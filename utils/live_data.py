@@ -1,15 +1,20 @@
-import random
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+_rng = np.random.default_rng()
+
 def generate_live_data(df):
-    df = df.copy()
+    # Shallow copy; only the columns written below get their own buffers
+    df = df.copy(deep=False)
+    for col in ("Water_Usage_Liters", "Pressure", "Date"):
+        df[col] = df[col].copy()
 
-    # Randomly change last row to simulate live reading
-    idx = df.sample(1).index[0]
+    # Randomly change one row to simulate live reading
+    idx = df.index[_rng.integers(len(df))]
 
-    df.loc[idx, "Water_Usage_Liters"] += random.randint(-50, 200)
-    df.loc[idx, "Pressure"] += random.uniform(-0.3, 0.2)
-    df.loc[idx, "Date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    df.at[idx, "Water_Usage_Liters"] += _rng.integers(-50, 201)
+    df.at[idx, "Pressure"] += _rng.uniform(-0.3, 0.2)
+    df.at[idx, "Date"] = pd.Timestamp(datetime.now()).floor("s")
 
     return df